@@ -0,0 +1,72 @@
+# analytics_utils.py
+"""Cohort risk statistics computed from the Parquet export (see export_data.py).
+
+Reads only the exported files, never heartline.db, e.g.:
+
+    from analytics_utils import cohort_stats
+    cohort_stats("exports", by=["sex", "age_band"], start="2025-01-01")
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from export_data import DAY_FIELD, REPORT_SCHEMA
+
+AGE_BINS = [0, 40, 50, 60, 70, 200]
+AGE_LABELS = ["<40", "40-49", "50-59", "60-69", "70+"]
+
+REPORT_COLUMNS = [
+    "id", "user_id", "date", "age", "sex", "chest_pain_type", "resting_bp",
+    "cholesterol", "fasting_bs", "max_hr", "exercise_angina", "oldpeak",
+    "st_slope", "prediction", "probability",
+]
+
+def load_reports(export_dir, start=None, end=None, columns=None):
+    """Load exported reports, pruning day partitions outside [start, end]."""
+    dataset = ds.dataset(
+        os.path.join(export_dir, "report"), format="parquet",
+        schema=REPORT_SCHEMA.append(DAY_FIELD),
+        partitioning=ds.partitioning(pa.schema([DAY_FIELD]), flavor="hive"),
+    )
+    flt = None
+    if start is not None:
+        flt = ds.field("day") >= str(pd.Timestamp(start).date())
+    if end is not None:
+        cond = ds.field("day") <= str(pd.Timestamp(end).date())
+        flt = cond if flt is None else flt & cond
+    table = dataset.to_table(columns=columns or REPORT_COLUMNS, filter=flt)
+    return table.to_pandas()
+
+def cohort_stats(export_dir, by=("sex", "age_band"), start=None, end=None):
+    """Per-cohort report counts, mean probability and high-risk rate."""
+    df = load_reports(export_dir, start, end)
+    by = list(by)
+    if "age_band" in by:
+        df["age_band"] = pd.cut(df["age"], bins=AGE_BINS, labels=AGE_LABELS, right=False)
+    df["high_risk"] = (df["prediction"] == "High Risk").astype(int)
+
+    stats = df.groupby(by, observed=True).agg(
+        reports=("id", "size"),
+        patients=("user_id", "nunique"),
+        mean_probability=("probability", "mean"),
+        high_risk=("high_risk", "sum"),
+        mean_cholesterol=("cholesterol", "mean"),
+        mean_max_hr=("max_hr", "mean"),
+    )
+    stats["risk_percent"] = (stats["high_risk"] / stats["reports"] * 100).round(1)
+    return stats.reset_index()
+
+def daily_risk_trend(export_dir, start=None, end=None):
+    """Reports and high-risk share per day."""
+    df = load_reports(export_dir, start, end, columns=["date", "prediction", "probability"])
+    df["day"] = pd.to_datetime(df["date"]).dt.floor("D")
+    df["high_risk"] = (df["prediction"] == "High Risk").astype(int)
+    trend = df.groupby("day").agg(
+        reports=("prediction", "size"),
+        high_risk=("high_risk", "sum"),
+        mean_probability=("probability", "mean"),
+    )
+    trend["risk_percent"] = (trend["high_risk"] / trend["reports"] * 100).round(1)
+    return trend.reset_index()
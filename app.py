@@ -1,33 +1,71 @@
 import os
+import hashlib
+import secrets
 import joblib 
 import pandas as pd
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash
+from functools import wraps
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, g
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.utils import secure_filename
 import ocr_utils 
+import drift_utils
+import model_utils
+import cache_utils
+import compact_model
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'heartline_secure_key_2025'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///heartline.db'
+# Overridable so bench_server.py can run serve.py against a scratch database
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('HEARTLINE_DATABASE_URI', 'sqlite:///heartline.db')
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 db = SQLAlchemy(app)
+# A deploy that changes templates or views must not be answered with 304s
+cache_utils.set_etag_salt(os.path.join(app.root_path, app.template_folder), __file__)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
 # --- LOAD MODELS ---
+MODEL_PATH = 'models/best_rf_calibrated.pkl'
+PREPROCESSOR_PATH = 'models/preprocessor.pkl'
+COMPACT_MODEL_PATH = compact_model.DEFAULT_PATH
+
+def read_models():
+    # Raises if nothing usable can be loaded
+    try:
+        # Using joblib as per your fix
+        return joblib.load(MODEL_PATH), joblib.load(PREPROCESSOR_PATH)
+    except Exception:
+        # Edge boxes ship only the compact artifact (acts as both objects)
+        if os.path.exists(COMPACT_MODEL_PATH):
+            cm = compact_model.CompactModel.load(COMPACT_MODEL_PATH)
+            return cm, cm
+        raise
+
+def load_models(strict=False):
+    # strict=True is used by serve.py's reload: on failure it raises and the
+    # current model stays in place. Only startup falls back to the rule below.
+    global model, preprocessor
+    try:
+        new_model, new_preprocessor = read_models()
+    except Exception as e:
+        if strict:
+            raise
+        new_model = new_preprocessor = None
+    model, preprocessor = new_model, new_preprocessor
+
+load_models()
+
 try:
-    # Using joblib as per your fix
-    model = joblib.load('models/best_rf_calibrated.pkl')
-    preprocessor = joblib.load('models/preprocessor.pkl')
+    drift_monitor = drift_utils.DriftMonitor()
 except Exception as e:
-    model = None
-    preprocessor = None
+    drift_monitor = None
 
 # --- MODELS ---
 class User(UserMixin, db.Model):
@@ -61,6 +99,58 @@ class Report(db.Model):
     prediction = db.Column(db.String(50))
     probability = db.Column(db.Float)
 
+class DriftCount(db.Model):
+    # Streaming input sketch maintained by drift_utils.DriftMonitor
+    __tablename__ = 'drift_counts'
+    feature = db.Column(db.String(50), primary_key=True)
+    bucket = db.Column(db.String(50), primary_key=True)
+    period = db.Column(db.String(10), primary_key=True)  # UTC day, YYYY-MM-DD
+    n = db.Column(db.Integer, default=0)
+
+class ReportVersion(db.Model):
+    # Bumped with every new report / profile change; keys the page cache
+    __tablename__ = 'report_versions'
+    user_id = db.Column(db.Integer, primary_key=True)  # 0 = all reports
+    version = db.Column(db.Integer, default=0)
+    updated = db.Column(db.DateTime, default=datetime.utcnow)
+
+@event.listens_for(Report, 'after_insert')
+def report_inserted(mapper, connection, target):
+    # Same transaction as the report, so no worker can cache a stale page
+    cache_utils.bump_versions(connection, [target.user_id])
+
+class ApiToken(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    # Only a SHA-256 of the token is stored
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    created = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User')
+
+def build_report(user_id, data, prob):
+    return Report(
+        user_id=user_id,
+        age=data['Age'], sex=data['Sex'], chest_pain_type=data['ChestPainType'],
+        resting_bp=data['RestingBP'], cholesterol=data['Cholesterol'],
+        fasting_bs=data['FastingBS'], resting_ecg=data['RestingECG'],
+        max_hr=data['MaxHR'], exercise_angina=data['ExerciseAngina'],
+        oldpeak=data['Oldpeak'], st_slope=data['ST_Slope'],
+        prediction=model_utils.risk_label(prob), probability=prob
+    )
+
+def report_version(user_id):
+    row = ReportVersion.query.get(user_id)
+    return (row.version, row.updated) if row else (0, None)
+
+def cached_view(name, scope, render, extra=()):
+    # A page depends on the viewer (nav, name) and on the reports in `scope`;
+    # `extra` covers anything else on the page that changes on its own
+    viewer = report_version(current_user.id)
+    reports = viewer if scope == current_user.id else report_version(scope)
+    key = (name, current_user.id, viewer[0], scope, reports[0], extra)
+    last_modified = max((t for _, t in (viewer, reports) if t), default=None)
+    return cache_utils.cached_page(key, last_modified, render)
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -111,37 +201,50 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
+    extra = ()
     if current_user.role == 'admin':
-        # --- ADMIN ANALYTICS LOGIC ---
-        # 1. Fetch ALL reports
-        all_reports = Report.query.order_by(Report.date.desc()).all()
+        scope = cache_utils.ALL_REPORTS
+        # Drift moves with its time window, not with report inserts, so its
+        # current scores (cached inside the monitor) are part of the page key
+        drift = drift_monitor.scores(db.session) if drift_monitor else []
+        extra = tuple((d['feature'], d['samples'], d['psi'], d['ks']) for d in drift)
+        def render():
+            # --- ADMIN ANALYTICS LOGIC ---
+            # 1. Fetch ALL reports
+            all_reports = Report.query.order_by(Report.date.desc()).all()
         
-        # 2. Calculate Stats for the Dashboard
-        total_patients = len(set(r.user_id for r in all_reports))
-        total_reports = len(all_reports)
-        high_risk_count = Report.query.filter_by(prediction='High Risk').count()
-        low_risk_count = Report.query.filter_by(prediction='Low Risk').count()
+            # 2. Calculate Stats for the Dashboard
+            total_patients = len(set(r.user_id for r in all_reports))
+            total_reports = len(all_reports)
+            high_risk_count = Report.query.filter_by(prediction='High Risk').count()
+            low_risk_count = Report.query.filter_by(prediction='Low Risk').count()
         
-        # Avoid division by zero
-        if total_reports > 0:
-            risk_percent = round((high_risk_count / total_reports) * 100, 1)
-        else:
-            risk_percent = 0
-
-        # Pass 'stats' dictionary to the template
-        return render_template('admin/dashboard.html', 
-                             reports=all_reports, 
-                             stats={
-                                 'total_patients': total_patients,
-                                 'total_reports': total_reports,
-                                 'high_risk': high_risk_count,
-                                 'low_risk': low_risk_count,
-                                 'risk_percent': risk_percent
-                             })
+            # Avoid division by zero
+            if total_reports > 0:
+                risk_percent = round((high_risk_count / total_reports) * 100, 1)
+            else:
+                risk_percent = 0
+
+            # Pass 'stats' dictionary to the template
+            return render_template('admin/dashboard.html', 
+                                 reports=all_reports, 
+                                 drift=drift,
+                                 drift_window=drift_monitor.window_days if drift_monitor else 0,
+                                 stats={
+                                     'total_patients': total_patients,
+                                     'total_reports': total_reports,
+                                     'high_risk': high_risk_count,
+                                     'low_risk': low_risk_count,
+                                     'risk_percent': risk_percent
+                                 })
     else:
-        # User Logic
-        user_reports = Report.query.filter_by(user_id=current_user.id).order_by(Report.date.desc()).all()
-        return render_template('user/dashboard.html', reports=user_reports)
+        scope = current_user.id
+        def render():
+            # User Logic
+            user_reports = Report.query.filter_by(user_id=current_user.id).order_by(Report.date.desc()).all()
+            return render_template('user/dashboard.html', reports=user_reports)
+
+    return cached_view('dashboard', scope, render, extra)
 
 @app.route('/predict', methods=['GET', 'POST'])
 @login_required
@@ -176,48 +279,20 @@ def predict():
                 "ST_Slope": request.form.get('st_slope')
             }
 
-        # 2. Sanitize Data (Fix for NoneType error)
-        for key in data:
-            if data[key] is None or data[key] == '':
-                if key in ['Sex', 'ChestPainType', 'RestingECG', 'ExerciseAngina', 'ST_Slope']:
-                    data[key] = 'M' if key == 'Sex' else 'Normal'
-                else:
-                    data[key] = 0
-
-        # Type Conversion
+        # 2. Sanitize Data (Fix for NoneType error) + Type Conversion
         try:
-            data['Age'] = int(data['Age'])
-            data['RestingBP'] = int(data['RestingBP'])
-            data['Cholesterol'] = float(data['Cholesterol'])
-            data['FastingBS'] = int(data['FastingBS'])
-            data['MaxHR'] = int(data['MaxHR'])
-            data['Oldpeak'] = float(data['Oldpeak'])
-        except ValueError:
+            data = model_utils.sanitize_row(data)
+        except (TypeError, ValueError):
             flash("Error processing inputs.")
             return redirect(url_for('predict'))
 
         # 3. Prediction
         try:
-            df = pd.DataFrame([data])
-            if model and preprocessor:
-                 X_processed = preprocessor.transform(df)
-                 prob = model.predict_proba(X_processed)[0][1]
-            else:
-                 # Fallback logic if model fails
-                 prob = 0.92 if data['Cholesterol'] > 240 else 0.15
-            
-            prediction_text = "High Risk" if prob > 0.5 else "Low Risk"
-
-            new_report = Report(
-                user_id=current_user.id,
-                age=data['Age'], sex=data['Sex'], chest_pain_type=data['ChestPainType'],
-                resting_bp=data['RestingBP'], cholesterol=data['Cholesterol'],
-                fasting_bs=data['FastingBS'], resting_ecg=data['RestingECG'],
-                max_hr=data['MaxHR'], exercise_angina=data['ExerciseAngina'],
-                oldpeak=data['Oldpeak'], st_slope=data['ST_Slope'],
-                prediction=prediction_text, probability=prob
-            )
+            prob = float(model_utils.score_frame(pd.DataFrame([data]), model, preprocessor)[0])
+            new_report = build_report(current_user.id, data, prob)
             db.session.add(new_report)
+            if drift_monitor:
+                drift_monitor.record(db.session, data)
             db.session.commit()
             return redirect(url_for('dashboard'))
 
@@ -234,6 +309,8 @@ def profile():
         current_user.name = request.form['name']
         if request.form['password']:
             current_user.password = request.form['password']
+        # Name appears on the cached dashboards / print views
+        cache_utils.bump_versions(db.session, [current_user.id])
         db.session.commit()
         flash('Profile Updated')
     return render_template('user/profile.html')
@@ -241,11 +318,148 @@ def profile():
 @app.route('/report/<int:report_id>/print')
 @login_required
 def print_report(report_id):
-    report = Report.query.get_or_404(report_id)
-    return render_template('user/report_print.html', r=report, user=current_user)
+    # Reports are immutable, so only the viewer's own version matters
+    def render():
+        report = Report.query.get_or_404(report_id)
+        return render_template('user/report_print.html', r=report, user=current_user)
+    return cached_view(('print', report_id), current_user.id, render)
+
+# --- JSON API (v1) ---
+# Plain sync views: concurrency comes from serve.py's per-worker thread pool
+# (and its worker processes), so a slow OCR upload only holds its own thread.
+API_BATCH_LIMIT = 1000
+
+def hash_token(raw):
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def token_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Bearer '):
+            return jsonify(error='Missing bearer token'), 401
+        token = ApiToken.query.filter_by(token_hash=hash_token(header[7:].strip())).first()
+        if not token:
+            return jsonify(error='Invalid token'), 401
+        g.api_user = token.user
+        return view(*args, **kwargs)
+    return wrapper
+
+def report_json(r):
+    return {
+        'id': r.id, 'user_id': r.user_id, 'date': r.date.isoformat(),
+        'inputs': {
+            'Age': r.age, 'Sex': r.sex, 'ChestPainType': r.chest_pain_type,
+            'RestingBP': r.resting_bp, 'Cholesterol': r.cholesterol,
+            'FastingBS': r.fasting_bs, 'RestingECG': r.resting_ecg,
+            'MaxHR': r.max_hr, 'ExerciseAngina': r.exercise_angina,
+            'Oldpeak': r.oldpeak, 'ST_Slope': r.st_slope
+        },
+        'prediction': r.prediction, 'probability': r.probability
+    }
+
+def parse_rows(items):
+    # Strict validation: the API never fills in defaults like the HTML form
+    rows, errors = [], []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': i, 'error': 'Expected an object'})
+            continue
+        try:
+            rows.append(model_utils.validate_row(item))
+        except ValueError as e:
+            errors.append({'index': i, 'error': str(e)})
+    return rows, errors
+
+def score_and_save(user_id, rows):
+    # One predict_proba call and one commit for the whole request
+    probs = model_utils.score_frame(pd.DataFrame(rows, columns=model_utils.FEATURES), model, preprocessor)
+    reports = [build_report(user_id, row, float(p)) for row, p in zip(rows, probs)]
+    db.session.add_all(reports)
+    if drift_monitor:
+        for row in rows:
+            drift_monitor.record(db.session, row)
+    db.session.commit()
+    return [report_json(r) for r in reports]
+
+@app.route('/api/v1/token', methods=['POST'])
+def api_token():
+    body = request.get_json(silent=True) or {}
+    user = User.query.filter_by(email=body.get('email')).first()
+    if not user or user.password != body.get('password'):
+        return jsonify(error='Invalid Email or Password.'), 401
+    raw = secrets.token_urlsafe(32)
+    db.session.add(ApiToken(user_id=user.id, token_hash=hash_token(raw)))
+    db.session.commit()
+    return jsonify(token=raw), 201
+
+@app.route('/api/v1/predict', methods=['POST'])
+@token_required
+def api_predict():
+    body = request.get_json(silent=True)
+    rows, errors = parse_rows([body])
+    if errors:
+        return jsonify(error='Invalid input', details=errors), 400
+    reports = score_and_save(g.api_user.id, rows)
+    return jsonify(reports[0]), 201
+
+@app.route('/api/v1/predict/batch', methods=['POST'])
+@token_required
+def api_predict_batch():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify(error="Expected a JSON object with a 'records' list"), 400
+    records = body.get('records')
+    if not isinstance(records, list) or not records:
+        return jsonify(error="Expected a non-empty 'records' list"), 400
+    if len(records) > API_BATCH_LIMIT:
+        return jsonify(error=f'At most {API_BATCH_LIMIT} records per batch'), 413
+    rows, errors = parse_rows(records)
+    if errors:
+        return jsonify(error='Invalid input', details=errors), 400
+    reports = score_and_save(g.api_user.id, rows)
+    return jsonify(reports=reports), 201
+
+@app.route('/api/v1/predict/ocr', methods=['POST'])
+@token_required
+def api_predict_ocr():
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        return jsonify(error="Missing 'file' upload"), 400
+    # Unique name so concurrent uploads of e.g. report.pdf don't collide
+    filename = f"{secrets.token_hex(8)}_{secure_filename(file.filename)}"
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file.save(filepath)
+    try:
+        data = ocr_utils.ocr_to_row(filepath)
+    except Exception as e:
+        return jsonify(error=f'OCR Error: {e}'), 422
+    finally:
+        os.remove(filepath)
+    rows, errors = parse_rows([data])
+    if errors:
+        return jsonify(error='Invalid input', details=errors, extracted=data), 400
+    reports = score_and_save(g.api_user.id, rows)
+    return jsonify(reports[0]), 201
+
+@app.route('/api/v1/reports', methods=['GET'])
+@token_required
+def api_reports():
+    limit = max(1, min(request.args.get('limit', 100, type=int), API_BATCH_LIMIT))
+    reports = Report.query.filter_by(user_id=g.api_user.id).order_by(Report.date.desc()).limit(limit).all()
+    return jsonify(reports=[report_json(r) for r in reports])
+
+@app.route('/api/v1/reports/<int:report_id>', methods=['GET'])
+@token_required
+def api_report(report_id):
+    report = Report.query.get(report_id)
+    # Patients only see their own reports; 404 either way so ids don't leak
+    if not report or (report.user_id != g.api_user.id and g.api_user.role != 'admin'):
+        return jsonify(error='Report not found'), 404
+    return jsonify(report_json(report))
 
 # --- INITIAL SETUP ---
-if __name__ == '__main__':
+def setup_database():
     with app.app_context():
         db.create_all()
         
@@ -262,4 +476,6 @@ if __name__ == '__main__':
             db.session.commit()
             print(f"✅ Admin Account Created: {admin_email}")
 
+if __name__ == '__main__':
+    setup_database()
     app.run(debug=True)
\ No newline at end of file
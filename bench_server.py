@@ -0,0 +1,212 @@
+# bench_server.py
+"""Load benchmark for serve.py, used to pick worker/thread counts.
+
+Usage:
+    python bench_server.py                       # sweep and write serve_tuning.json
+    python bench_server.py --url http://127.0.0.1:5000/ --concurrency 32
+                                                 # measure an already running server
+    python bench_server.py --compare-predict     # HTML form predict vs. JSON API
+
+The sweep starts serve.py for each workers x threads combination, registers
+a fresh patient account and has concurrent clients submit the predict form
+(scoring, DB write, redirect and dashboard render), keeping the combination
+with the highest requests/second.
+
+The sweep and --compare-predict start their own serve.py against a scratch
+SQLite database (HEARTLINE_DATABASE_URI), so the thousands of benchmark
+reports never reach instance/heartline.db or the admin/drift statistics.
+Passing --url measures that server as-is.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+BENCH_PORT = 8765
+TUNING_FILE = "serve_tuning.json"  # read by serve.py
+
+SAMPLE_ROW = {
+    "Age": 54, "Sex": "M", "ChestPainType": "ASY", "RestingBP": 140,
+    "Cholesterol": 239, "FastingBS": 0, "RestingECG": "Normal", "MaxHR": 150,
+    "ExerciseAngina": "N", "Oldpeak": 1.0, "ST_Slope": "Flat",
+}
+
+# Form field names used by the predict page
+FORM_FIELDS = {
+    "age": "Age", "sex": "Sex", "chest_pain_type": "ChestPainType",
+    "resting_bp": "RestingBP", "cholesterol": "Cholesterol",
+    "fasting_bs": "FastingBS", "resting_ecg": "RestingECG", "max_hr": "MaxHR",
+    "exercise_angina": "ExerciseAngina", "oldpeak": "Oldpeak", "st_slope": "ST_Slope",
+}
+
+def get_page(url):
+    def request():
+        with urllib.request.urlopen(url, timeout=10) as resp:
+            resp.read()
+    return request
+
+def register_patient(base, tag):
+    """Create a throwaway patient account so every run starts from no reports."""
+    email = f"bench-{tag}-{int(time.time() * 1000)}@example.com"
+    password = "bench"
+    form = urllib.parse.urlencode({"email": email, "password": password, "name": "Bench Patient"}).encode()
+    urllib.request.urlopen(f"{base}/register", form, timeout=10).read()
+    return email, password
+
+def form_predict(base, email, password):
+    """Log in once, then submit the HTML predict form (redirect + dashboard)."""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor())
+    login = urllib.parse.urlencode({"email": email, "password": password}).encode()
+    opener.open(f"{base}/login", login, timeout=10).read()
+    form = urllib.parse.urlencode({k: SAMPLE_ROW[v] for k, v in FORM_FIELDS.items()}).encode()
+    def request():
+        with opener.open(f"{base}/predict", form, timeout=30) as resp:
+            resp.read()
+    return request
+
+def api_predict(base, email, password):
+    """Fetch a token once, then POST JSON to /api/v1/predict."""
+    body = json.dumps({"email": email, "password": password}).encode()
+    req = urllib.request.Request(f"{base}/api/v1/token", body, {"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        token = json.load(resp)["token"]
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+    payload = json.dumps(SAMPLE_ROW).encode()
+    def request():
+        req = urllib.request.Request(f"{base}/api/v1/predict", payload, headers)
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            resp.read()
+    return request
+
+def hit(request, deadline):
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            request()
+            latencies.append(time.perf_counter() - t0)
+        except Exception:
+            errors += 1
+    return latencies, errors
+
+def measure(make_request, concurrency=32, duration=10):
+    """Run ``concurrency`` clients, each built by make_request(), for ``duration`` s."""
+    # Log in / fetch tokens for every client before the clock starts
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        clients = list(pool.map(lambda _: make_request(), range(concurrency)))
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda request: hit(request, deadline), clients))
+    latencies = [l for lat, _ in results for l in lat]
+    errors = sum(e for _, e in results)
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+    }
+
+def compare_predict(base, email, password, concurrency, duration):
+    if not email:
+        email, password = register_patient(base, "compare")
+    for name, make in (("form /predict", form_predict), ("api /api/v1/predict", api_predict)):
+        result = measure(lambda: make(base, email, password), concurrency, duration)
+        print(f"{name}: {result}")
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return True
+        except Exception:
+            time.sleep(0.3)
+    return False
+
+@contextmanager
+def scratch_server(workers=None, threads=None):
+    """Run serve.py on BENCH_PORT against a throwaway database; yields the base URL."""
+    tmp = tempfile.mkdtemp(prefix="heartline-bench-")
+    env = dict(os.environ, HEARTLINE_DATABASE_URI=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    cmd = [sys.executable, "serve.py", "--port", str(BENCH_PORT)]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    if threads:
+        cmd += ["--threads", str(threads)]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{BENCH_PORT}"
+    try:
+        if not wait_until_up(f"{base}/"):
+            raise RuntimeError("server did not start")
+        yield base
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def sweep(worker_counts, thread_counts, concurrency, duration):
+    best = None
+    for workers in worker_counts:
+        for threads in thread_counts:
+            try:
+                with scratch_server(workers, threads) as base:
+                    email, password = register_patient(base, f"{workers}x{threads}")
+                    result = measure(lambda: form_predict(base, email, password), concurrency, duration)
+            except RuntimeError as e:
+                print(f"{workers}x{threads}: {e}")
+                continue
+            print(f"{workers} workers x {threads} threads: {result}")
+            if best is None or result["rps"] > best["rps"]:
+                best = dict(result, workers=workers, threads=threads)
+    return best
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark the Heart-Link server")
+    parser.add_argument("--url", help="Benchmark this running server instead of sweeping")
+    parser.add_argument("--compare-predict", action="store_true",
+                        help="Form predict route vs. JSON API, same concurrency "
+                             "(on a scratch server unless --url is given)")
+    parser.add_argument("--email", help="Patient account for --compare-predict "
+                                        "(default: register a throwaway patient)")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({max(1, cpus // 2), cpus, cpus * 2}))
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    if args.compare_predict:
+        if args.url:
+            compare_predict(args.url.rstrip("/"), args.email, args.password,
+                            args.concurrency, args.duration)
+        else:
+            # Worker/thread counts come from serve.py (serve_tuning.json or defaults)
+            with scratch_server() as base:
+                compare_predict(base, args.email, args.password, args.concurrency, args.duration)
+        return
+    if args.url:
+        print(measure(lambda: get_page(args.url), args.concurrency, args.duration))
+        return
+
+    best = sweep(args.workers, args.threads, args.concurrency, args.duration)
+    if best:
+        with open(TUNING_FILE, "w") as f:
+            json.dump({"workers": best["workers"], "threads": best["threads"]}, f, indent=2)
+        print(f"✅ Best: {best['workers']} workers x {best['threads']} threads "
+              f"({best['rps']} req/s) -> {TUNING_FILE}")
+
+if __name__ == "__main__":
+    main()
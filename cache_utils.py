@@ -0,0 +1,100 @@
+# cache_utils.py
+"""Rendered-page cache for the dashboard and print views.
+
+Pages are keyed by the viewer and the report-version counters they depend
+on (the report_versions table in app.py). A counter is bumped in the same
+transaction as every new Report or profile change, so a stale key is never
+looked up again. The same key drives the ETag, so repeat visits get a 304
+without touching templates. The ETag is salted with a hash of the templates
+and view code, so a deploy that changes them invalidates browser copies too.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import make_response, request, session
+from sqlalchemy import text
+
+MAX_PAGES = 512
+
+# report_versions row that tracks every report (admin views)
+ALL_REPORTS = 0
+
+class PageCache:
+    """Small thread-safe LRU of rendered HTML, one per worker process."""
+
+    def __init__(self, max_pages=MAX_PAGES):
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._pages.get(key)
+            if html is not None:
+                self._pages.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            self._pages[key] = html
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+page_cache = PageCache()
+
+# Mixed into every ETag; set once at startup by set_etag_salt()
+etag_salt = ""
+
+def set_etag_salt(*paths):
+    """Salt ETags with a hash of these files / directories' contents."""
+    global etag_salt
+    h = hashlib.sha1()
+    for root in paths:
+        if os.path.isfile(root):
+            files = [root]
+        else:
+            files = sorted(os.path.join(d, f) for d, _, names in os.walk(root) for f in names)
+        for path in files:
+            h.update(os.path.basename(path).encode())
+            with open(path, "rb") as f:
+                h.update(f.read())
+    etag_salt = h.hexdigest()[:16]
+
+def bump_versions(conn, user_ids):
+    """Invalidate cached pages for these users and for the admin views."""
+    now = datetime.utcnow()
+    ids = {ALL_REPORTS} | {u for u in user_ids if u is not None}
+    conn.execute(text(
+        "INSERT INTO report_versions VALUES(:u, 1, :t) "
+        "ON CONFLICT(user_id) DO UPDATE SET version = version + 1, updated = :t"
+    ), [{"u": u, "t": now} for u in ids])
+
+def cached_page(key, last_modified, render):
+    """Serve ``render()`` through the page cache with ETag/Last-Modified."""
+    # Pending flash messages are part of the layout, so render those fresh
+    if session.get('_flashes'):
+        return make_response(render())
+
+    resp = make_response('')
+    resp.set_etag(hashlib.sha1(repr((etag_salt, key)).encode()).hexdigest())
+    if last_modified:
+        resp.last_modified = last_modified.replace(microsecond=0)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    resp.make_conditional(request)
+    if resp.status_code == 304:
+        return resp
+
+    html = page_cache.get(key)
+    if html is None:
+        html = render()
+        page_cache.set(key, html)
+    resp.set_data(html)
+    return resp
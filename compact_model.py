@@ -0,0 +1,292 @@
+# compact_model.py
+# Memory-mapped, numpy-only copy of the fitted preprocessor + forest (raw or
+# sigmoid-calibrated). File format: see "Compact Model" in README.md.
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"HLMODEL\0"
+FORMAT_VERSION = 1
+ALIGN = 64
+DEFAULT_PATH = "models/heartlink_compact.hlm"
+CALIBRATED_PATH = "models/best_rf_calibrated.pkl"
+RAW_PATH = "models/best_rf_raw.pkl"
+
+# Cap on rows x trees walked at once, to bound the temporary arrays
+_WALK_CELLS = 1 << 20
+
+# --- LOADING / SCORING (numpy only) ---
+class CompactModel:
+    """Standalone predictor over a memory-mapped .hlm file.
+
+    Provides ``transform`` and ``predict_proba`` like the fitted
+    preprocessor/model pair, so one instance can stand in for both
+    (e.g. ``model_utils.score_frame(df, cm, cm)``).
+    """
+
+    def __init__(self, header, arrays):
+        self.header = header
+        self.arrays = arrays
+        self.numeric = header["numeric"]
+        self.categorical = header["categorical"]
+        self.n_features = header["n_features"]
+        self.max_depth = header["max_depth"]
+        self.folds = header["folds"]
+
+        self._medians = np.asarray(self.numeric["medians"], dtype=np.float64)
+        self._means = np.asarray(self.numeric["means"], dtype=np.float64)
+        self._scales = np.asarray(self.numeric["scales"], dtype=np.float64)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(mm[:8]) != MAGIC:
+            raise ValueError(f"{path} is not a compact model file")
+        (header_len,) = struct.unpack("<I", bytes(mm[8:12]))
+        header = json.loads(bytes(mm[12:12 + header_len]).decode())
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model version {header['version']}")
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            start = spec["offset"]
+            arrays[name] = mm[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+        return cls(header, arrays)
+
+    def transform(self, X):
+        """Raw feature columns (DataFrame or dict of columns) -> model matrix."""
+        cols = self.numeric["columns"]
+        n = len(X[cols[0]] if cols else X[self.categorical["columns"][0]])
+        out = np.zeros((n, self.n_features), dtype=np.float64)
+
+        for j, col in enumerate(cols):
+            vals = np.asarray(X[col], dtype=np.float64)
+            vals = np.where(np.isnan(vals), self._medians[j], vals)
+            out[:, j] = (vals - self._means[j]) / self._scales[j]
+
+        pos = len(cols)
+        cat = self.categorical
+        for col, fill, choices in zip(cat["columns"], cat["fill"], cat["categories"]):
+            vals = np.asarray(X[col], dtype=object)
+            missing = np.array([v is None or (isinstance(v, float) and v != v) for v in vals], dtype=bool)
+            vals = np.where(missing, fill, vals)
+            # Unknown categories leave every column at 0 (handle_unknown="ignore")
+            for k, choice in enumerate(choices):
+                out[:, pos + k] = vals == choice
+            pos += len(choices)
+        return out
+
+    def _forest_proba(self, X32, trees):
+        a = self.arrays
+        feature, threshold = a["feature"], a["threshold"]
+        left, right, value = a["left"], a["right"], a["value"]
+        roots = a["roots"][trees]
+        rows = np.arange(len(X32))[:, None]
+
+        node = np.broadcast_to(roots, (len(X32), len(roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = X32[rows, feature[node]] <= threshold[node]
+            node = np.where(go_left, left[node], right[node])
+        return value[node].astype(np.float64).mean(axis=1)
+
+    def predict_proba(self, X):
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        a = self.arrays
+        p1 = np.zeros(len(X32), dtype=np.float64)
+        for f, fold in enumerate(self.folds):
+            trees = np.arange(a["tree_offsets"][f], a["tree_offsets"][f + 1])
+            step = max(1, _WALK_CELLS // max(len(trees), 1))
+            raw = np.concatenate([
+                self._forest_proba(X32[i:i + step], trees)
+                for i in range(0, len(X32), step)
+            ]) if len(X32) else np.zeros(0)
+            if fold["sigmoid"] is not None:
+                # sklearn _SigmoidCalibration: expit(-(a * f + b))
+                sa, sb = fold["sigmoid"]
+                raw = 1.0 / (1.0 + np.exp(sa * raw + sb))
+            p1 += raw
+        p1 /= len(self.folds)
+        return np.column_stack([1.0 - p1, p1])
+
+# --- EXPORT (needs the fitted sklearn objects) ---
+def _float32_floor(values):
+    """Largest float32 <= each float64 threshold (keeps x <= t decisions)."""
+    f32 = values.astype(np.float32)
+    over = f32.astype(np.float64) > values
+    f32[over] = np.nextafter(f32[over], np.float32(-np.inf))
+    return f32
+
+def _describe_preprocessor(preprocessor):
+    # The file layout is all numeric columns, then all one-hot columns, which
+    # only matches ColumnTransformer output when the blocks come in that order
+    numeric = {"columns": [], "medians": [], "means": [], "scales": []}
+    categorical = {"columns": [], "fill": [], "categories": []}
+    for name, pipe, columns in preprocessor.transformers_:
+        if pipe == "drop" or len(columns) == 0:
+            continue
+        if name == "remainder" or pipe == "passthrough":
+            raise ValueError("Passthrough columns are not supported")
+        steps = {type(step).__name__: step for _, step in pipe.steps}
+        columns = list(columns)
+        if "OneHotEncoder" in steps:
+            enc = steps["OneHotEncoder"]
+            if getattr(enc, "drop_idx_", None) is not None:
+                raise ValueError("OneHotEncoder(drop=...) is not supported")
+            imputer = steps.get("SimpleImputer")
+            fill = imputer.statistics_.tolist() if imputer is not None else [None] * len(columns)
+            categorical["columns"] += columns
+            categorical["fill"] += [_native(v) for v in fill]
+            categorical["categories"] += [[_native(v) for v in c] for c in enc.categories_]
+        else:
+            if categorical["columns"]:
+                raise ValueError(f"Numeric transformer '{name}' follows a categorical one; "
+                                 "only numeric-then-categorical layouts are supported")
+            imputer = steps.get("SimpleImputer")
+            scaler = steps.get("StandardScaler")
+            n = len(columns)
+            numeric["columns"] += columns
+            numeric["medians"] += imputer.statistics_.tolist() if imputer is not None else [0.0] * n
+            numeric["means"] += scaler.mean_.tolist() if scaler is not None and scaler.mean_ is not None else [0.0] * n
+            numeric["scales"] += scaler.scale_.tolist() if scaler is not None and scaler.scale_ is not None else [1.0] * n
+    return numeric, categorical
+
+def _native(v):
+    return v.item() if hasattr(v, "item") else v
+
+def _folds(model):
+    """(forest, sigmoid or None) pairs for a raw or calibrated forest."""
+    if not hasattr(model, "calibrated_classifiers_"):
+        return [(model, None)]
+    folds = []
+    for cc in model.calibrated_classifiers_:
+        forest = cc.estimator if hasattr(cc, "estimator") else cc.base_estimator
+        calibrators = getattr(cc, "calibrators", None) or cc.calibrators_
+        if len(calibrators) != 1 or not hasattr(calibrators[0], "a_"):
+            raise ValueError("Only binary sigmoid calibration is supported")
+        folds.append((forest, (float(calibrators[0].a_), float(calibrators[0].b_))))
+    return folds
+
+def _flatten(folds):
+    feature, threshold, left, right, value = [], [], [], [], []
+    roots, tree_offsets, fold_meta = [], [0], []
+    base, max_depth = 0, 0
+    for forest, sigmoid in folds:
+        pos = list(forest.classes_).index(1)
+        for est in forest.estimators_:
+            t = est.tree_
+            n = t.node_count
+            leaf = t.children_left == -1
+            idx = np.arange(n)
+            counts = t.value[:, 0, :]
+            feature.append(np.where(leaf, 0, t.feature).astype(np.int16))
+            threshold.append(np.where(leaf, np.inf, t.threshold))
+            left.append(np.where(leaf, idx, t.children_left) + base)
+            right.append(np.where(leaf, idx, t.children_right) + base)
+            value.append(counts[:, pos] / counts.sum(axis=1))
+            roots.append(base)
+            base += n
+            max_depth = max(max_depth, t.max_depth)
+        tree_offsets.append(len(roots))
+        fold_meta.append({"sigmoid": list(sigmoid) if sigmoid else None})
+
+    if base >= 2 ** 31:
+        raise ValueError("Forest too large for int32 node indices")
+    arrays = {
+        "feature": np.concatenate(feature),
+        "threshold": _float32_floor(np.concatenate(threshold).astype(np.float64)),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "value": np.concatenate(value).astype(np.float32),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "tree_offsets": np.asarray(tree_offsets, dtype=np.int32),
+    }
+    return arrays, fold_meta, max_depth
+
+def export(model, preprocessor, path=DEFAULT_PATH):
+    numeric, categorical = _describe_preprocessor(preprocessor)
+    arrays, folds, max_depth = _flatten(_folds(model))
+    n_features = len(numeric["columns"]) + sum(len(c) for c in categorical["categories"])
+    if n_features > np.iinfo(np.int16).max:
+        raise ValueError("Too many features for int16 feature indices")
+
+    header = {
+        "version": FORMAT_VERSION,
+        "numeric": numeric,
+        "categorical": categorical,
+        "n_features": n_features,
+        "max_depth": int(max_depth),
+        "folds": folds,
+        "arrays": {},
+    }
+
+    # Offsets depend on the header size, so lay out until it stops changing
+    offsets = {}
+    while True:
+        header["arrays"] = {
+            name: {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offsets.get(name, 0)}
+            for name, arr in arrays.items()
+        }
+        blob = json.dumps(header).encode()
+        pos = -(-(12 + len(blob)) // ALIGN) * ALIGN
+        new_offsets = {}
+        for name, arr in arrays.items():
+            new_offsets[name] = pos
+            pos = -(-(pos + arr.nbytes) // ALIGN) * ALIGN
+        if new_offsets == offsets:
+            break
+        offsets = new_offsets
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(blob)))
+        f.write(blob)
+        for name, arr in arrays.items():
+            f.write(b"\0" * (offsets[name] - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+    return path
+
+def verify(path, model, preprocessor, csv_path="data/raw/heart.csv", tol=1e-5):
+    """Compare compact vs. pickled probabilities on the training CSV."""
+    import pandas as pd
+    df = pd.read_csv(csv_path).drop(columns=["HeartDisease"], errors="ignore")
+    expected = model.predict_proba(preprocessor.transform(df))[:, 1]
+    cm = CompactModel.load(path)
+    got = cm.predict_proba(cm.transform(df))[:, 1]
+    max_diff = float(np.max(np.abs(expected - got)))
+    labels_match = bool(np.all((expected > 0.5) == (got > 0.5)))
+    return max_diff <= tol and labels_match, max_diff
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact model artifact tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    exp = sub.add_parser("export", help="Export joblib model + preprocessor")
+    exp.add_argument("--model", help=f"Default: {CALIBRATED_PATH}, or {RAW_PATH} if that is missing")
+    exp.add_argument("--preprocessor", default="models/preprocessor.pkl")
+    exp.add_argument("--out", default=DEFAULT_PATH)
+    exp.add_argument("--verify", action="store_true",
+                     help="Check probability agreement on data/raw/heart.csv")
+    args = parser.parse_args()
+
+    if args.model is None:
+        args.model = CALIBRATED_PATH if os.path.exists(CALIBRATED_PATH) else RAW_PATH
+    for path in (args.model, args.preprocessor):
+        if not os.path.exists(path):
+            parser.error(f"{path} not found")
+
+    import joblib
+    model = joblib.load(args.model)
+    preprocessor = joblib.load(args.preprocessor)
+    export(model, preprocessor, args.out)
+    print(f"✅ Wrote {args.out}")
+    if args.verify:
+        ok, max_diff = verify(args.out, model, preprocessor)
+        print(f"{'✅' if ok else '❌'} max |Δp| on heart.csv = {max_diff:.2e}")
+        if not ok:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
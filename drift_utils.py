@@ -0,0 +1,155 @@
+# drift_utils.py
+"""Input-distribution drift monitoring for live predictions.
+
+A reference profile is built once from the training CSV: decile bin edges
+and proportions per numeric feature, category proportions per categorical
+feature. Every prediction bumps one counter per feature for the current
+UTC day in the drift_counts table (DriftCount in app.py) inside the
+caller's transaction, so the live sketch is O(1) to update, shared by all
+workers and never needs a scan of the reports table. PSI and a binned KS
+statistic are recomputed over the last ``window_days`` days at most every
+``interval`` seconds, so drift that starts long after deploy isn't diluted
+by months of older traffic. Features with fewer than ``min_samples``
+predictions in the window are reported as "Insufficient data", not scored.
+"""
+import math
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+REFERENCE_CSV = "data/raw/heart.csv"
+REFRESH_SECONDS = 300
+WINDOW_DAYS = 7
+# With ~10 bins, PSI on fewer samples is mostly noise
+MIN_SAMPLES = 100
+
+NUMERIC_FEATURES = ["Age","RestingBP","Cholesterol","MaxHR","Oldpeak"]
+CATEGORICAL_FEATURES = ["Sex","ChestPainType","FastingBS","RestingECG","ExerciseAngina","ST_Slope"]
+
+# Rule-of-thumb PSI bands
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+_EPS = 1e-4
+
+def build_reference(path=REFERENCE_CSV, n_bins=10):
+    df = pd.read_csv(path)
+    profile = {}
+    for col in NUMERIC_FEATURES:
+        vals = df[col].astype(float).to_numpy()
+        inner = np.unique(np.quantile(vals, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        idx = np.searchsorted(inner, vals, side="right")
+        counts = np.bincount(idx, minlength=len(inner) + 1)
+        profile[col] = {
+            "edges": inner.tolist(),
+            "buckets": [str(i) for i in range(len(inner) + 1)],
+            "expected": (counts / counts.sum()).tolist(),
+        }
+    for col in CATEGORICAL_FEATURES:
+        share = df[col].astype(str).value_counts(normalize=True)
+        profile[col] = {
+            "buckets": share.index.tolist(),
+            "expected": share.tolist(),
+        }
+    return profile
+
+def psi(expected, actual):
+    return sum(
+        (a - e) * math.log(a / e)
+        for e, a in ((max(e, _EPS), max(a, _EPS)) for e, a in zip(expected, actual))
+    )
+
+def binned_ks(expected, actual):
+    cum_e = cum_a = gap = 0.0
+    for e, a in zip(expected, actual):
+        cum_e += e
+        cum_a += a
+        gap = max(gap, abs(cum_e - cum_a))
+    return gap
+
+def drift_level(value):
+    if value >= PSI_SIGNIFICANT:
+        return "Significant"
+    if value >= PSI_MODERATE:
+        return "Moderate"
+    return "Stable"
+
+class DriftMonitor:
+    def __init__(self, reference_path=REFERENCE_CSV, interval=REFRESH_SECONDS,
+                 window_days=WINDOW_DAYS, min_samples=MIN_SAMPLES):
+        self.profile = build_reference(reference_path)
+        self.interval = interval
+        self.window_days = window_days
+        self.min_samples = min_samples
+        self._cached = None
+        self._computed_at = 0.0
+
+    def bucket(self, feature, value):
+        spec = self.profile[feature]
+        if feature in NUMERIC_FEATURES:
+            return str(bisect_right(spec["edges"], float(value)))
+        value = str(value)
+        # Unseen categories get their own bucket so they show up as drift
+        return value if value in spec["buckets"] else "__other__"
+
+    def record(self, session, row):
+        """Count one prediction input; committed with the caller's session."""
+        period = datetime.utcnow().strftime("%Y-%m-%d")
+        params = [
+            {"f": feature, "b": self.bucket(feature, row[feature]), "p": period}
+            for feature in NUMERIC_FEATURES + CATEGORICAL_FEATURES
+            if row.get(feature) is not None
+        ]
+        session.execute(text(
+            "INSERT INTO drift_counts(feature, bucket, period, n) VALUES(:f, :b, :p, 1) "
+            "ON CONFLICT(feature, bucket, period) DO UPDATE SET n = n + 1"
+        ), params)
+
+    def compute(self, session):
+        # Day strings sort chronologically, so the window is a plain >= filter
+        since = (datetime.utcnow() - timedelta(days=self.window_days - 1)).strftime("%Y-%m-%d")
+        counts = {}
+        for feature, bucket, n in session.execute(text(
+            "SELECT feature, bucket, SUM(n) FROM drift_counts "
+            "WHERE period >= :since GROUP BY feature, bucket"
+        ), {"since": since}):
+            counts.setdefault(feature, {})[bucket] = n
+
+        scores = []
+        for feature, spec in self.profile.items():
+            observed = counts.get(feature, {})
+            total = sum(observed.values())
+            if not total:
+                continue
+            if total < self.min_samples:
+                scores.append({"feature": feature, "samples": total, "psi": None,
+                               "ks": None, "level": "Insufficient data"})
+                continue
+            buckets = list(spec["buckets"])
+            expected = list(spec["expected"])
+            if "__other__" in observed:
+                buckets.append("__other__")
+                expected.append(0.0)
+            actual = [observed.get(b, 0) / total for b in buckets]
+            value = psi(expected, actual)
+            scores.append({
+                "feature": feature,
+                "samples": total,
+                "psi": round(value, 3),
+                # KS needs an ordering, so only numeric bins get one
+                "ks": round(binned_ks(expected, actual), 3) if feature in NUMERIC_FEATURES else None,
+                "level": drift_level(value),
+            })
+        # Scored features first, highest PSI on top
+        return sorted(scores, key=lambda s: (s["psi"] is not None, s["psi"] or 0), reverse=True)
+
+    def scores(self, session, force=False):
+        now = time.monotonic()
+        if force or self._cached is None or now - self._computed_at >= self.interval:
+            self._cached = self.compute(session)
+            self._computed_at = now
+        return self._cached
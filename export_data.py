@@ -0,0 +1,124 @@
+# export_data.py
+"""Incremental columnar export of predictions for analytics.
+
+Usage:
+    python export_data.py --out exports
+
+Each run copies only rows newer than the last exported id (the watermark)
+from the Report table (heartline.db) and the Streamlit history table
+(heart_app.db) into Parquet datasets partitioned by day:
+
+    exports/report/day=2025-01-31/report-<first id>-0.parquet
+    exports/history/day=2025-01-31/history-<first id>-0.parquet
+
+Files are named after the first id they hold, so re-running after a crash
+rewrites the same files instead of duplicating rows.
+"""
+import argparse
+import json
+import os
+import sqlite3
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import database
+
+EXPORT_DIR = "exports"
+CHUNK_SIZE = 50000
+WATERMARK_FILE = "_watermark.json"
+
+# Fixed column types, so a chunk that is all NULL in some column (e.g. user_id
+# from an import without --user-email) isn't written as Arrow `null` and
+# clash with later chunks. Dates stay as the ISO text SQLite returns.
+REPORT_SCHEMA = pa.schema([
+    ("id", pa.int64()), ("user_id", pa.int64()), ("date", pa.string()),
+    ("age", pa.int64()), ("sex", pa.string()), ("chest_pain_type", pa.string()),
+    ("resting_bp", pa.int64()), ("cholesterol", pa.float64()), ("fasting_bs", pa.int64()),
+    ("resting_ecg", pa.string()), ("max_hr", pa.int64()), ("exercise_angina", pa.string()),
+    ("oldpeak", pa.float64()), ("st_slope", pa.string()),
+    ("prediction", pa.string()), ("probability", pa.float64()),
+])
+HISTORY_SCHEMA = pa.schema([
+    ("id", pa.int64()), ("user_id", pa.int64()), ("probability", pa.float64()),
+    ("risk", pa.string()), ("created_at", pa.string()),
+])
+SCHEMAS = {"report": REPORT_SCHEMA, "history": HISTORY_SCHEMA}
+
+# Hive partition column added by write_partitioned
+DAY_FIELD = pa.field("day", pa.string())
+
+# --- WATERMARK ---
+def load_watermarks(out_dir):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_watermarks(out_dir, marks):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(marks, f, indent=2)
+    os.replace(tmp, path)
+
+# --- EXPORT ---
+def write_partitioned(df, out_dir, table, date_col):
+    df["day"] = pd.to_datetime(df[date_col]).dt.strftime("%Y-%m-%d")
+    first_id = int(df["id"].iloc[0])
+    schema = SCHEMAS[table].append(DAY_FIELD)
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df, schema=schema, preserve_index=False),
+        root_path=os.path.join(out_dir, table),
+        partition_cols=["day"],
+        basename_template=f"{table}-{first_id}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+def export_table(con, out_dir, table, date_col, marks, chunk_size=CHUNK_SIZE):
+    last_id = marks.get(table, 0)
+    query = f"SELECT * FROM {table} WHERE id > ? ORDER BY id"
+    exported = 0
+    for chunk in pd.read_sql_query(query, con, params=(last_id,), chunksize=chunk_size):
+        if chunk.empty:
+            continue
+        write_partitioned(chunk, out_dir, table, date_col)
+        # Advance the watermark only once the chunk is on disk
+        marks[table] = int(chunk["id"].iloc[-1])
+        save_watermarks(out_dir, marks)
+        exported += len(chunk)
+    return exported
+
+def export_reports(out_dir, marks):
+    from app import app, db
+    with app.app_context():
+        db.create_all()
+        con = sqlite3.connect(db.engine.url.database)
+        try:
+            return export_table(con, out_dir, "report", "date", marks)
+        finally:
+            con.close()
+
+def export_history(out_dir, marks):
+    database.init_db()
+    con = database.get_db()
+    try:
+        return export_table(con, out_dir, "history", "created_at", marks)
+    finally:
+        con.close()
+
+def run_export(out_dir=EXPORT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    marks = load_watermarks(out_dir)
+    n_reports = export_reports(out_dir, marks)
+    n_history = export_history(out_dir, marks)
+    print(f"✅ Exported {n_reports} reports and {n_history} history rows to {out_dir}")
+    return n_reports, n_history
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export predictions to partitioned Parquet")
+    parser.add_argument("--out", default=EXPORT_DIR, help="Export root directory")
+    args = parser.parse_args()
+    run_export(args.out)
@@ -0,0 +1,183 @@
+# import_records.py
+"""Bulk import of legacy screening records into the Report table.
+
+Usage:
+    python import_records.py data/raw/heart.csv --user-email admin@gmail.com
+
+The input (CSV or Parquet, shaped like data/raw/heart.csv) is streamed in
+chunks, normalized, scored one chunk at a time and written with executemany.
+Progress is stored in the same transaction as the rows, so re-running the
+same command after an interruption picks up where it stopped. Progress is
+keyed by path, size and mtime, so a replaced or appended file starts over.
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+from app import app, db, Report, User, model, preprocessor
+from cache_utils import bump_versions
+from model_utils import normalize_frame, score_frame, risk_label
+
+CHUNK_SIZE = 5000
+CHUNKS_PER_TXN = 10
+MAX_REJECTS_SHOWN = 20
+
+# --- INPUT STREAMING ---
+def iter_chunks(path, chunk_size, skip_rows=0):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+        seen = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            df = batch.to_pandas()
+            if seen + len(df) <= skip_rows:
+                seen += len(df)
+                continue
+            if seen < skip_rows:
+                df = df.iloc[skip_rows - seen:]
+            seen += len(df)
+            yield df
+    else:
+        # Skip already-imported data rows but keep the header (row 0)
+        skip = range(1, skip_rows + 1) if skip_rows else None
+        yield from pd.read_csv(path, chunksize=chunk_size, skiprows=skip)
+
+# --- PROGRESS (RESUME) ---
+def source_key(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+def ensure_progress_table(conn):
+    conn.execute(text("""
+    CREATE TABLE IF NOT EXISTS import_progress(
+        source TEXT PRIMARY KEY,
+        rows_done INTEGER,
+        updated_at TEXT
+    )"""))
+
+def get_progress(conn, source):
+    row = conn.execute(
+        text("SELECT rows_done FROM import_progress WHERE source=:s"), {"s": source}
+    ).fetchone()
+    return row[0] if row else 0
+
+def set_progress(conn, source, rows_done):
+    conn.execute(
+        text("INSERT OR REPLACE INTO import_progress VALUES(:s, :n, :t)"),
+        {"s": source, "n": rows_done, "t": datetime.utcnow().isoformat()}
+    )
+
+# --- CHUNK -> REPORT ROWS ---
+def build_rows(chunk, user_id, imported_at):
+    """Report rows for the valid records, plus positions of rejected ones."""
+    clean, valid = normalize_frame(chunk)
+    rejected = [i for i, ok in enumerate(valid) if not ok]
+    clean = clean[valid]
+    if clean.empty:
+        return [], rejected
+
+    probs = score_frame(clean, model, preprocessor)
+    if "Date" in chunk:
+        dates = pd.to_datetime(chunk.loc[clean.index, "Date"], errors="coerce")
+        dates = dates.dt.to_pydatetime()
+    else:
+        dates = [imported_at] * len(clean)
+
+    rows = []
+    for rec, prob, date in zip(clean.itertuples(index=False), probs, dates):
+        prob = float(prob)
+        rows.append({
+            "user_id": user_id,
+            "date": imported_at if pd.isna(date) else date,
+            "age": rec.Age, "sex": rec.Sex, "chest_pain_type": rec.ChestPainType,
+            "resting_bp": rec.RestingBP, "cholesterol": rec.Cholesterol,
+            "fasting_bs": rec.FastingBS, "resting_ecg": rec.RestingECG,
+            "max_hr": rec.MaxHR, "exercise_angina": rec.ExerciseAngina,
+            "oldpeak": rec.Oldpeak, "st_slope": rec.ST_Slope,
+            "prediction": risk_label(prob),
+            "probability": prob,
+        })
+    return rows, rejected
+
+# --- MAIN LOOP ---
+def run_import(path, user_id=None, chunk_size=CHUNK_SIZE, chunks_per_txn=CHUNKS_PER_TXN):
+    source = source_key(path)
+    insert = Report.__table__.insert()
+    imported_at = datetime.utcnow()
+
+    with db.engine.begin() as conn:
+        ensure_progress_table(conn)
+        done = get_progress(conn, source)
+    if done:
+        print(f"Resuming {path} after {done} rows")
+
+    written = rejected = 0
+    start = time.perf_counter()
+    chunks = iter_chunks(path, chunk_size, skip_rows=done)
+
+    while True:
+        batch = []
+        for _ in range(chunks_per_txn):
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            batch.append(chunk)
+        if not batch:
+            break
+
+        # One transaction per batch of chunks: rows + progress commit together
+        batch_written, bad_rows = 0, []
+        with db.engine.begin() as conn:
+            for chunk in batch:
+                rows, bad = build_rows(chunk, user_id, imported_at)
+                if rows:
+                    conn.execute(insert, rows)
+                batch_written += len(rows)
+                # 1-based data row numbers (the CSV line is one more, for the header)
+                bad_rows += [done + i + 1 for i in bad]
+                done += len(chunk)
+            set_progress(conn, source, done)
+            # Core inserts skip the ORM hook, so invalidate cached pages here
+            if batch_written:
+                bump_versions(conn, [user_id])
+        written += batch_written
+        rejected += len(bad_rows)
+
+        if bad_rows:
+            shown = ", ".join(map(str, bad_rows[:MAX_REJECTS_SHOWN]))
+            more = f" (+{len(bad_rows) - MAX_REJECTS_SHOWN} more)" if len(bad_rows) > MAX_REJECTS_SHOWN else ""
+            print(f"⚠️ Rejected data rows {shown}{more}")
+
+        elapsed = time.perf_counter() - start
+        print(f"{done} rows read, {written} written, {rejected} rejected "
+              f"({written / elapsed:,.0f} rows/s)")
+
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed > 0 else 0
+    print(f"✅ Imported {written} reports ({rejected} rejected) in {elapsed:.1f}s — {rate:,.0f} rows/s")
+    return written, rejected
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import historical screening records")
+    parser.add_argument("path", help="CSV or Parquet file shaped like data/raw/heart.csv")
+    parser.add_argument("--user-email", help="Attach imported reports to this account")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--chunks-per-txn", type=int, default=CHUNKS_PER_TXN)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        user_id = None
+        if args.user_email:
+            user = User.query.filter_by(email=args.user_email).first()
+            if not user:
+                parser.error(f"No user with email {args.user_email}")
+            user_id = user.id
+        run_import(args.path, user_id, args.chunk_size, args.chunks_per_txn)
+
+if __name__ == "__main__":
+    main()
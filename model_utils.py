@@ -0,0 +1,145 @@
+# model_utils.py
+import math
+
+import numpy as np
+import pandas as pd
+
+from ocr_utils import norm_sex, norm_yesno
+
+FEATURES = [
+    "Age","Sex","ChestPainType","RestingBP","Cholesterol",
+    "FastingBS","RestingECG","MaxHR","ExerciseAngina","Oldpeak","ST_Slope"
+]
+
+NUMERIC = ["Age","RestingBP","Cholesterol","FastingBS","MaxHR","Oldpeak"]
+INT_COLUMNS = ["Age","RestingBP","FastingBS","MaxHR"]
+
+# Known category spellings from data/raw/heart.csv
+CATEGORIES = {
+    "ChestPainType": ["ATA","NAP","ASY","TA"],
+    "RestingECG": ["Normal","ST","LVH"],
+    "ST_Slope": ["Up","Flat","Down"],
+}
+
+# Plausible clinical ranges (inclusive). heart.csv uses 0 for unmeasured
+# RestingBP / Cholesterol, so 0 stays valid there.
+RANGES = {
+    "Age": (0, 120), "RestingBP": (0, 300), "Cholesterol": (0, 1000),
+    "FastingBS": (0, 1), "MaxHR": (0, 250), "Oldpeak": (-10, 10),
+}
+
+# Defaults for empty fields in submitted rows
+DEFAULTS = {
+    "Sex": "M", "ChestPainType": "Normal", "RestingECG": "Normal",
+    "ExerciseAngina": "Normal", "ST_Slope": "Normal",
+}
+
+def _number(key, val):
+    """Convert one numeric field, raising ValueError if it's not usable."""
+    try:
+        num = float(val)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be a number, got {val!r}")
+    # Infinity / NaN / 1e400 would reach int() or the model otherwise
+    if not math.isfinite(num):
+        raise ValueError(f"{key} must be a finite number, got {val!r}")
+    lo, hi = RANGES[key]
+    if not lo <= num <= hi:
+        raise ValueError(f"{key} must be between {lo} and {hi}, got {val!r}")
+    return int(num) if key in INT_COLUMNS else num
+
+def sanitize_row(data):
+    """Fill blanks and convert types for a single submitted row.
+
+    Raises ValueError if a numeric field can't be converted or is out of range.
+    """
+    row = {}
+    for key in FEATURES:
+        val = data.get(key)
+        if val is None or val == '':
+            val = DEFAULTS.get(key, 0)
+        row[key] = val
+    for key in NUMERIC:
+        row[key] = _number(key, row[key])
+    return row
+
+def validate_row(data):
+    """Strict version of sanitize_row for the JSON API: nothing is defaulted.
+
+    Missing fields, bad numbers and unknown categories are all reported in
+    one ValueError; known categories are returned in their canonical spelling.
+    """
+    row, errors = {}, []
+    for key in FEATURES:
+        val = data.get(key)
+        if val is None or val == '':
+            errors.append(f"{key} is required")
+            continue
+        if key in NUMERIC:
+            try:
+                row[key] = _number(key, val)
+            except ValueError as e:
+                errors.append(str(e))
+            continue
+        if key == "Sex":
+            canon = norm_sex(val)
+        elif key == "ExerciseAngina":
+            canon = norm_yesno(val)
+        else:
+            canon = {c.lower(): c for c in CATEGORIES[key]}.get(str(val).strip().lower())
+        if canon is None:
+            errors.append(f"{key} has unknown value {val!r}")
+        row[key] = canon
+    if errors:
+        raise ValueError("; ".join(errors))
+    return row
+
+def _canonical(values, choices):
+    lookup = {c.lower(): c for c in choices}
+    return values.map(lambda v: lookup.get(str(v).strip().lower()) if pd.notna(v) else None)
+
+def normalize_frame(df):
+    """Clean a chunk of raw rows in place of the per-row predict sanitizing.
+
+    Returns (clean_df, valid_mask). Rows whose numeric fields can't be parsed
+    or whose categories are unknown are flagged invalid rather than guessed.
+    """
+    out = pd.DataFrame(index=df.index)
+    valid = pd.Series(True, index=df.index)
+
+    for col in NUMERIC:
+        raw = df[col] if col in df else pd.Series(np.nan, index=df.index)
+        vals = pd.to_numeric(raw, errors="coerce")
+        vals = vals.where(np.isfinite(vals))
+        valid &= vals.between(*RANGES[col])
+        out[col] = vals.fillna(0)
+    for col in INT_COLUMNS:
+        out[col] = out[col].astype(int)
+    out["Cholesterol"] = out["Cholesterol"].astype(float)
+    out["Oldpeak"] = out["Oldpeak"].astype(float)
+
+    # Sex / angina follow the OCR normalizers so both paths agree
+    sex = df["Sex"].map(norm_sex) if "Sex" in df else pd.Series(None, index=df.index)
+    angina = df["ExerciseAngina"].map(norm_yesno) if "ExerciseAngina" in df else pd.Series(None, index=df.index)
+    valid &= sex.notna() & angina.notna()
+    out["Sex"] = sex.fillna(DEFAULTS["Sex"])
+    out["ExerciseAngina"] = angina.fillna(DEFAULTS["ExerciseAngina"])
+
+    for col, choices in CATEGORIES.items():
+        raw = df[col] if col in df else pd.Series(None, index=df.index)
+        vals = _canonical(raw, choices)
+        valid &= vals.notna()
+        out[col] = vals.fillna(DEFAULTS[col])
+
+    return out[FEATURES], valid
+
+def score_frame(df, model, preprocessor):
+    """Probability of heart disease for every row of ``df`` in one call."""
+    if model is not None and preprocessor is not None:
+        X = preprocessor.transform(df[FEATURES])
+        return model.predict_proba(X)[:, 1]
+    # Fallback logic if model fails (mirrors the predict route)
+    return np.where(df["Cholesterol"].to_numpy() > 240, 0.92, 0.15)
+
+def risk_label(prob):
+    return "High Risk" if prob > 0.5 else "Low Risk"
@@ -0,0 +1,233 @@
+# serve.py
+"""Production launcher (pre-fork, POSIX only).
+
+Usage:
+    python serve.py --host 0.0.0.0 --port 8000
+
+The parent process creates the schema and admin account once, loads the
+model and forks the workers. Workers inherit the model pages copy-on-write
+(gc.freeze keeps the collector from touching them) and share one listening
+socket. Each worker serves requests from a bounded thread pool: once every
+thread is busy the worker stops accepting, so extra connections wait in the
+listen backlog (or go to another worker) instead of piling up in memory.
+
+The database comes from app.py's config; set HEARTLINE_DATABASE_URI to
+point the server somewhere else (bench_server.py uses a scratch SQLite file).
+
+Reload without dropping requests:
+  - kill -HUP <parent pid>, or
+  - replace the files at app.MODEL_PATH / app.PREPROCESSOR_PATH
+    (or app.COMPACT_MODEL_PATH)
+The parent reloads the model, forks a new set of workers and then stops the
+old ones. Each old worker finishes its in-flight requests before exiting.
+
+Worker/thread counts come from --workers/--threads, then serve_tuning.json
+(written by bench_server.py), then a CPU-count default.
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer
+
+import app as heartline
+
+TUNING_FILE = "serve_tuning.json"
+MODEL_POLL_SECONDS = 2
+WORKER_STOP_TIMEOUT = 30
+
+# --- WORKER ---
+class PooledWSGIServer(BaseWSGIServer):
+    """werkzeug server that hands connections to a fixed-size thread pool."""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd):
+        super().__init__(host, port, app, fd=fd)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        # The executor's queue is unbounded, so cap accepted-but-unfinished
+        # connections at the thread count ourselves
+        self.slots = threading.BoundedSemaphore(threads)
+
+    def process_request(self, request, client_address):
+        # Blocks the accept loop while all threads are busy
+        self.slots.acquire()
+        try:
+            self.pool.submit(self._handle, request, client_address)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+def run_worker(sock, host, port, threads):
+    server = PooledWSGIServer(host, port, heartline.app, threads, fd=sock.fileno())
+
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever returns, so call it off-thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    try:
+        server.serve_forever()
+    finally:
+        server.pool.shutdown(wait=True)
+    os._exit(0)
+
+# --- MASTER ---
+def model_stamp():
+    stamp = []
+    for path in (heartline.MODEL_PATH, heartline.PREPROCESSOR_PATH, heartline.COMPACT_MODEL_PATH):
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def resolve_counts(workers, threads):
+    tuned = {}
+    if os.path.exists(TUNING_FILE):
+        with open(TUNING_FILE) as f:
+            tuned = json.load(f)
+    cpus = os.cpu_count() or 1
+    return (
+        workers or tuned.get("workers") or cpus,
+        threads or tuned.get("threads") or 4,
+    )
+
+class Master:
+    def __init__(self, host, port, workers, threads):
+        self.host, self.port = host, port
+        self.workers, self.threads = workers, threads
+        self.pids = set()
+        self.reload_requested = False
+        self.stopping = False
+
+    def prepare(self):
+        heartline.setup_database()
+        # Don't hand the parent's pooled DB connections to the children
+        with heartline.app.app_context():
+            heartline.db.engine.dispose()
+        # Move everything loaded so far out of the GC's reach so the
+        # collector doesn't write to (and un-share) the model pages
+        gc.collect()
+        gc.freeze()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.sock, self.host, self.port, self.threads)
+        self.pids.add(pid)
+        return pid
+
+    def spawn_all(self):
+        return {self.spawn() for _ in range(self.workers)}
+
+    def stop_workers(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + WORKER_STOP_TIMEOUT
+        pending = set(pids)
+        while pending and time.monotonic() < deadline:
+            for pid in list(pending):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    pending.discard(pid)
+            time.sleep(0.1)
+        for pid in pending:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.pids -= set(pids)
+
+    def reload(self):
+        print("🔄 Reloading model and workers")
+        try:
+            heartline.load_models(strict=True)
+        except Exception as e:
+            # e.g. a model file caught half-written; the next mtime change retries
+            print(f"❌ Model reload failed, keeping current model and workers: {e}")
+            return
+        gc.collect()
+        gc.freeze()
+        old = set(self.pids)
+        # New generation first, so the socket is never left without a worker
+        self.spawn_all()
+        self.stop_workers(old)
+
+    def reap(self):
+        while self.pids:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if pid in self.pids:
+                self.pids.discard(pid)
+                if not self.stopping:
+                    print(f"⚠️ Worker {pid} exited, restarting")
+                    self.spawn()
+
+    def run(self):
+        self.prepare()
+        self.sock = socket.create_server((self.host, self.port), backlog=2048)
+        self.sock.set_inheritable(True)
+
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "reload_requested", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "stopping", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "stopping", True))
+
+        self.spawn_all()
+        print(f"✅ Serving on http://{self.host}:{self.port} "
+              f"({self.workers} workers x {self.threads} threads, parent {os.getpid()})")
+
+        stamp = model_stamp()
+        while not self.stopping:
+            time.sleep(MODEL_POLL_SECONDS)
+            self.reap()
+            current = model_stamp()
+            if current != stamp or self.reload_requested:
+                stamp = current
+                self.reload_requested = False
+                self.reload()
+
+        self.stop_workers(set(self.pids))
+        self.sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Heart-Link with pre-forked workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int)
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork(); on Windows use `python app.py`.")
+    workers, threads = resolve_counts(args.workers, args.threads)
+    Master(args.host, args.port, workers, threads).run()
+
+if __name__ == "__main__":
+    main()
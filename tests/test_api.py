@@ -0,0 +1,92 @@
+# tests/test_api.py
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VALID_ROW = {
+    "Age": 54, "Sex": "M", "ChestPainType": "ASY", "RestingBP": 140,
+    "Cholesterol": 239, "FastingBS": 0, "RestingECG": "Normal", "MaxHR": 150,
+    "ExerciseAngina": "N", "Oldpeak": 1.0, "ST_Slope": "Flat",
+}
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    # app.py resolves models/ and data/ relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    os.environ["HEARTLINE_DATABASE_URI"] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    try:
+        heartline = importlib.import_module("app")
+        heartline.setup_database()
+        yield heartline.app.test_client()
+    finally:
+        os.environ.pop("HEARTLINE_DATABASE_URI", None)
+        os.chdir(cwd)
+
+@pytest.fixture(scope="module")
+def auth(client):
+    resp = client.post("/api/v1/token", json={"email": "admin@gmail.com", "password": "admin@123"})
+    assert resp.status_code == 201
+    return {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+def predict(client, auth, row):
+    return client.post("/api/v1/predict", json=row, headers=auth)
+
+def test_predict_valid_row(client, auth):
+    resp = predict(client, auth, VALID_ROW)
+    assert resp.status_code == 201
+    assert resp.get_json()["inputs"]["Sex"] == "M"
+
+def test_predict_requires_token(client):
+    assert client.post("/api/v1/predict", json=VALID_ROW).status_code == 401
+
+def test_predict_rejects_empty_object(client, auth):
+    resp = predict(client, auth, {})
+    assert resp.status_code == 400
+    error = resp.get_json()["details"][0]["error"]
+    assert "Age is required" in error and "ST_Slope is required" in error
+
+@pytest.mark.parametrize("field, value", [
+    ("Sex", "banana"),
+    ("ChestPainType", "???"),
+    ("ExerciseAngina", "maybe"),
+])
+def test_predict_rejects_unknown_category(client, auth, field, value):
+    resp = predict(client, auth, dict(VALID_ROW, **{field: value}))
+    assert resp.status_code == 400
+    assert field in resp.get_json()["details"][0]["error"]
+
+@pytest.mark.parametrize("field, raw", [
+    ("Age", "1e300"),
+    ("Age", "1e400"),
+    ("Oldpeak", "Infinity"),
+    ("Cholesterol", "NaN"),
+    ("MaxHR", "-5"),
+])
+def test_predict_rejects_bad_numbers(client, auth, field, raw):
+    # Raw JSON, so non-finite literals reach the server unchanged
+    body = json.dumps(VALID_ROW).replace(f'"{field}": {json.dumps(VALID_ROW[field])}', f'"{field}": {raw}')
+    resp = client.post("/api/v1/predict", data=body, headers=dict(auth, **{"Content-Type": "application/json"}))
+    assert resp.status_code == 400
+    assert field in resp.get_json()["details"][0]["error"]
+
+def test_batch_rejects_non_object_body(client, auth):
+    resp = client.post("/api/v1/predict/batch", json=[VALID_ROW], headers=auth)
+    assert resp.status_code == 400
+
+def test_batch_reports_bad_record_index(client, auth):
+    resp = client.post("/api/v1/predict/batch", json={"records": [VALID_ROW, {"Age": 40}]}, headers=auth)
+    assert resp.status_code == 400
+    assert [d["index"] for d in resp.get_json()["details"]] == [1]
+
+def test_reports_limit_is_clamped(client, auth):
+    predict(client, auth, VALID_ROW)
+    resp = client.get("/api/v1/reports?limit=-1", headers=auth)
+    assert resp.status_code == 200
+    assert len(resp.get_json()["reports"]) == 1
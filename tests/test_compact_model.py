@@ -0,0 +1,79 @@
+# tests/test_compact_model.py
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import compact_model  # noqa: E402
+from compact_model import CompactModel  # noqa: E402
+
+CSV_PATH = os.path.join(ROOT, "data", "raw", "heart.csv")
+
+@pytest.fixture(scope="module")
+def preprocessor():
+    return joblib.load(os.path.join(ROOT, "models", "preprocessor.pkl"))
+
+@pytest.fixture(scope="module")
+def raw_model():
+    return joblib.load(os.path.join(ROOT, "models", "best_rf_raw.pkl"))
+
+@pytest.fixture(scope="module")
+def heart():
+    df = pd.read_csv(CSV_PATH)
+    return df.drop(columns=["HeartDisease"]), df["HeartDisease"]
+
+def test_raw_forest_matches_pickle(tmp_path, raw_model, preprocessor):
+    path = compact_model.export(raw_model, preprocessor, tmp_path / "raw.hlm")
+    ok, max_diff = compact_model.verify(path, raw_model, preprocessor, csv_path=CSV_PATH)
+    assert ok, max_diff
+
+def test_calibrated_forest_matches_pickle(tmp_path, preprocessor, heart):
+    X, y = heart
+    forest = RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0)
+    model = CalibratedClassifierCV(forest, method="sigmoid", cv=3)
+    model.fit(preprocessor.transform(X), y)
+
+    path = compact_model.export(model, preprocessor, tmp_path / "calibrated.hlm")
+    ok, max_diff = compact_model.verify(path, model, preprocessor, csv_path=CSV_PATH)
+    assert ok, max_diff
+    assert len(CompactModel.load(path).folds) == 3
+
+def test_empty_input(tmp_path, raw_model, preprocessor, heart):
+    cm = CompactModel.load(compact_model.export(raw_model, preprocessor, tmp_path / "raw.hlm"))
+    probs = cm.predict_proba(cm.transform(heart[0].iloc[:0]))
+    assert probs.shape == (0, 2)
+
+def test_unknown_category_and_missing_values(tmp_path, raw_model, preprocessor, heart):
+    cm = CompactModel.load(compact_model.export(raw_model, preprocessor, tmp_path / "raw.hlm"))
+    df = heart[0].iloc[:4].copy()
+    df.loc[df.index[0], "ChestPainType"] = "XYZ"
+    df.loc[df.index[1], "Cholesterol"] = np.nan
+    df.loc[df.index[2], "ST_Slope"] = np.nan
+    df.loc[df.index[3], ["Age", "RestingECG"]] = [np.nan, "Unknown"]
+
+    expected = preprocessor.transform(df)
+    np.testing.assert_allclose(cm.transform(df), expected)
+    np.testing.assert_allclose(
+        cm.predict_proba(cm.transform(df)), raw_model.predict_proba(expected), atol=1e-5
+    )
+
+def test_rejects_categorical_before_numeric(tmp_path, heart):
+    X, y = heart
+    pre = ColumnTransformer([
+        ("cat", Pipeline([("onehot", OneHotEncoder(handle_unknown="ignore"))]), ["Sex", "ST_Slope"]),
+        ("num", Pipeline([("scaler", StandardScaler())]), ["Age", "MaxHR"]),
+    ]).fit(X)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(pre.transform(X), y)
+    with pytest.raises(ValueError, match="numeric-then-categorical"):
+        compact_model.export(model, pre, tmp_path / "bad.hlm")